@@ -205,7 +205,7 @@ def train(
         }
 
         if do_save and not iter % save_freq:
-            path = f"{checkpoint_logdir}/model_{current_step}.pkl"
+            path = f"{checkpoint_logdir}/model_{current_step}.npz"
             train_utils.save_params(path, pmap.unpmap(training_state.params))
 
         epoch_log_time = perf_counter() - t
@@ -238,7 +238,7 @@ def train(
     assert current_step >= total_timesteps
 
     if checkpoint_logdir:
-        path = f"{checkpoint_logdir}/model_final.pkl"
+        path = f"{checkpoint_logdir}/model_final.npz"
         train_utils.save_params(path, pmap.unpmap(training_state.params))
 
     pmap.assert_is_replicated(training_state)
@@ -2,6 +2,8 @@
 
 """Encoders module."""
 
+from types import MappingProxyType
+
 from .attention_utils import AttentionLayer, FeedForward, LocalAttentionLayer, ReZero, nearest_neighbors_jax
 from .embedding_utils import build_mlp_embedding
 from .mgail import MGAILEncoder
@@ -13,6 +15,16 @@ from .wayformer import WayformerEncoder
 
 Encoder = MLPEncoder | PerceiverEncoder | WayformerEncoder | MTREncoder | MGAILEncoder
 
+_ENCODERS = MappingProxyType(
+    {
+        "mlp": MLPEncoder,
+        "perceiver": PerceiverEncoder,
+        "wayformer": WayformerEncoder,
+        "mtr": MTREncoder,
+        "mgail": MGAILEncoder,
+    },
+)
+
 
 def get_encoder(encoder_name: str, **kwargs) -> Encoder:
     """Retrieve an encoder class by its name.
@@ -28,18 +40,12 @@ def get_encoder(encoder_name: str, **kwargs) -> Encoder:
         ValueError: If an unknown encoder name is provided.
 
     """
-    encoders = {
-        "mlp": MLPEncoder,
-        "perceiver": PerceiverEncoder,
-        "wayformer": WayformerEncoder,
-        "mtr": MTREncoder,
-        "mgail": MGAILEncoder,
-    }
+    encoder = _ENCODERS.get(encoder_name.lower())
+
+    if encoder is None:
+        raise ValueError(f"Unknown encoder: {encoder_name}")
 
-    try:
-        return encoders[encoder_name.lower()]
-    except KeyError:
-        raise ValueError(f"Unknown encoder: {encoder_name}") from None
+    return encoder
 
 
 __all__ = [
@@ -57,7 +57,7 @@ def setup_evaluation(
         model_path, model_name = get_model_path(run_path + "model/")
 
         eval_path = (
-            f"{eval_name}/ai/{path_dataset}/{run_path.replace(f'{source_dir}/', '')}{model_name.replace('.pkl', '')}/"
+            f"{eval_name}/ai/{path_dataset}/{run_path.replace(f'{source_dir}/', '')}{os.path.splitext(model_name)[0]}/"
         )
 
         # Training config
@@ -184,9 +184,15 @@ def load_params(path: str) -> Any:
 
     """
     with epath.Path(path).open("rb") as fin:
-        buf = fin.read()
+        # Legacy checkpoints pickle the whole parameters pytree
+        if path.endswith(".pkl"):
+            return pickle.loads(fin.read())
 
-    return pickle.loads(buf)
+        archive = np.load(fin)
+        treedef = pickle.loads(archive["treedef"].tobytes())
+        leaves = [archive[f"leaf_{i}"] for i in range(treedef.num_leaves)]
+
+    return jax.tree_util.tree_unflatten(treedef, leaves)
 
 
 def get_model_path(model_path: str) -> tuple[str, str] | None:
@@ -199,19 +205,20 @@ def get_model_path(model_path: str) -> tuple[str, str] | None:
         A tuple of the model file path and name if found; otherwise, None.
 
     """
-    # Filter to get only files with .pkl extension
-    pkl_files = [f for f in os.listdir(model_path) if f.endswith(".pkl")]
-    if "model_final.pkl" in pkl_files:
-        model_name = "model_final.pkl"
+    # Filter to get only files with .npz (or legacy .pkl) extension
+    model_files = [f for f in os.listdir(model_path) if f.endswith((".npz", ".pkl"))]
+    final_files = [f for f in ("model_final.npz", "model_final.pkl") if f in model_files]
+    if final_files:
+        model_name = final_files[0]
     else:
-        pkl_files = [f for f in sorted(pkl_files, key=lambda f: int(re.findall(r"\d+", f)[0]))]
-        model_name = pkl_files[-1] if pkl_files else None
+        model_files = [f for f in sorted(model_files, key=lambda f: int(re.findall(r"\d+", f)[0]))]
+        model_name = model_files[-1] if model_files else None
 
     if model_name:
         print("Model name: ", model_name)
         return model_path + model_name, model_name
     else:
-        print("No .pkl files found in the directory")
+        print("No .npz or .pkl files found in the directory")
         return None
 
 
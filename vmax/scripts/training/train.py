@@ -81,20 +81,24 @@ def run(cfg: DictConfig) -> None:
     os.makedirs(model_path, exist_ok=True)
 
     writer = train_utils.setup_tensorboard(relative_run_path)
-    progress = partial(train_utils.log_metrics, writer=writer)
+    progress = partial(train_utils.log_metrics, writer=writer, log_batch_size=config["log_batch_size"])
 
     ## TRAINING
     train_fn = algorithms.get_train_fn(config["algorithm"]["name"])
 
-    train_fn(
-        env=env,
-        data_generator=data_generator,
-        eval_scenario=eval_scenario,
-        **run_config,
-        progress_fn=progress,
-        checkpoint_logdir=model_path,
-        disable_tqdm=not sys.stdout.isatty(),
-    )
+    try:
+        train_fn(
+            env=env,
+            data_generator=data_generator,
+            eval_scenario=eval_scenario,
+            **run_config,
+            progress_fn=progress,
+            checkpoint_logdir=model_path,
+            disable_tqdm=not sys.stdout.isatty(),
+        )
+    finally:
+        # Write the buffered metrics even if training is interrupted
+        train_utils.flush_metrics(writer)
 
 
 if __name__ == "__main__":
@@ -6,19 +6,26 @@
 import logging
 import os
 import pickle
+import sys
+import time
 from argparse import ArgumentParser
 from datetime import datetime
 from typing import Any
 
 import jax
+import numpy as np
 from etils import epath
-from tensorboardX import SummaryWriter
+from tensorboardX import SummaryWriter, summary
+from tensorboardX.proto import summary_pb2
 
 from vmax.simulator import datasets
 
 
 logger = logging.getLogger(__name__)
 
+# TensorBoard events buffered by `log_metrics` per writer, as (summary, num_steps, walltime) tuples
+_pending_summaries: dict[SummaryWriter, list[tuple[summary_pb2.Summary, int, float]]] = {}
+
 
 def resolve_output_dir(
     algorithm_name: str,
@@ -70,15 +77,19 @@ def apply_xla_flags(config: dict) -> None:
         xla_flags += "--xla_gpu_autotune_level=0 "  # SEEDING
     if config["perf_flag"]:
         xla_flags += "--xla_gpu_enable_pipelined_reduce_scatter=true "
-        xla_flags += "--xla_gpu_enable_triton_softmax_fusion=true "
         xla_flags += "--xla_gpu_triton_gemm_any=true "
+        xla_flags += "--xla_gpu_enable_latency_hiding_scheduler=true "
+        xla_flags += "--xla_gpu_enable_while_loop_double_buffering=true "
 
     os.environ["XLA_FLAGS"] = xla_flags
 
-    if config["cache_flag"]:
-        jax.config.update("jax_compilation_cache_dir", "/tmp/jax_cache")
+    # The persistent compilation cache is enabled unless explicitly disabled with `cache_flag=false`
+    if config.get("cache_flag", True):
+        cache_dir = os.environ.get("JAX_COMPILATION_CACHE_DIR") or config.get("cache_dir", "/tmp/jax_cache")
+        jax.config.update("jax_compilation_cache_dir", cache_dir)
         jax.config.update("jax_persistent_cache_min_entry_size_bytes", -1)
         jax.config.update("jax_persistent_cache_min_compile_time_secs", 0)
+        jax.config.update("jax_persistent_cache_enable_xla_caches", "xla_gpu_per_fusion_autotune_cache_dir")
 
 
 def log_metrics(
@@ -86,15 +97,20 @@ def log_metrics(
     metrics: dict | None = None,
     total_timesteps: int | None = None,
     writer: SummaryWriter = None,
+    log_batch_size: int = 1,
 ) -> None:
     """Log and print training metrics and optionally send them to TensorBoard.
 
+    All the scalars of a call are written as a single TensorBoard event, and events are buffered
+    until `log_batch_size` calls have been made.
+
     Args:
         num_steps: Number of steps.
         metrics: Dictionary of metric names and values.
         current_step: Current step count.
         total_timesteps: Total timesteps.
         writer: TensorBoard summary writer.
+        log_batch_size: Number of calls to buffer before writing to TensorBoard.
 
     """
     if total_timesteps is not None:
@@ -104,14 +120,55 @@ def log_metrics(
         logger.info(f"-> Log time      : {metrics['runtime/log_time']:.2f}s")
         logger.info(f"-> Eval time     : {metrics['runtime/eval_time']:.2f}s")
 
+    scalars = []
     for key, value in metrics.items():
         if writer:
             prefix = "metrics/" if "/" not in key else ""
             if "steps" in key or "rewards" in key:
                 prefix = "training/"
-            writer.add_scalar(f"{prefix}{key}", value, num_steps)
+            scalars.extend(summary.scalar(f"{prefix}{key}", value).value)
         logger.info(f"{key}: {value}")
 
+    if writer:
+        pending_summaries = _pending_summaries.setdefault(writer, [])
+        pending_summaries.append((summary_pb2.Summary(value=scalars), num_steps, time.time()))
+
+        if len(pending_summaries) >= log_batch_size:
+            flush_metrics(writer)
+
+
+def flush_metrics(writer: SummaryWriter) -> None:
+    """Write the metrics buffered for a writer to TensorBoard.
+
+    Args:
+        writer: TensorBoard summary writer.
+
+    """
+    pending_summaries = _pending_summaries.pop(writer, [])
+    if not pending_summaries:
+        return
+
+    file_writer = _get_file_writer(writer)
+    for scalars_summary, num_steps, walltime in pending_summaries:
+        file_writer.add_summary(scalars_summary, num_steps, walltime)
+
+
+def _get_file_writer(writer: SummaryWriter):
+    """Return the event file writer of a TensorBoard summary writer.
+
+    SummaryWriter has no public method to write a merged Summary event. Its public `file_writer`
+    attribute is reset to None when the writer is closed, while `_get_file_writer` reopens it, as
+    `add_scalar` itself does.
+
+    Args:
+        writer: TensorBoard summary writer.
+
+    Returns:
+        The underlying event file writer.
+
+    """
+    return writer._get_file_writer()
+
 
 def build_config_dicts(config: dict) -> tuple[dict, dict]:
     """Build separate configuration dictionaries for the environment and runtime.
@@ -180,11 +237,15 @@ def print_hyperparameters(args: dict) -> None:
         args: Dictionary of hyperparameters.
 
     """
-    print(" Experiment Summary ".center(40, "="))
-    print(f"- Algorithm          : {args['algorithm']['name']}")
-    print(f"- Observation Type   : {args['observation_type']}")
-    print(f"- Dataset Path       : {args['path_dataset']}")
-    print(f"- Total Timesteps    : {args['total_timesteps']}")
+    lines = [
+        " Experiment Summary ".center(40, "="),
+        f"- Algorithm          : {args['algorithm']['name']}",
+        f"- Observation Type   : {args['observation_type']}",
+        f"- Dataset Path       : {args['path_dataset']}",
+        f"- Total Timesteps    : {args['total_timesteps']}",
+    ]
+    # Emit the summary in a single write to avoid interleaving with other processes
+    sys.stdout.write("\n".join(lines) + "\n")
 
 
 def get_and_print_device_info() -> int:
@@ -195,9 +256,17 @@ def get_and_print_device_info() -> int:
 
 
 def save_params(path: str, params: Any) -> None:
-    """Serialize and save model parameters to a specified file."""
+    """Save model parameters to a specified file.
+
+    The leaves are written as raw arrays into a NumPy archive alongside the pickled tree structure,
+    which avoids serializing the whole parameters pytree into an in-memory pickle buffer.
+
+    """
+    leaves, treedef = jax.tree_util.tree_flatten(params)
+    arrays = {f"leaf_{i}": np.asarray(leaf) for i, leaf in enumerate(leaves)}
+
     with epath.Path(path).open("wb") as fout:
-        fout.write(pickle.dumps(params))
+        np.savez(fout, treedef=np.frombuffer(pickle.dumps(treedef), dtype=np.uint8), **arrays)
 
 
 def setup_tensorboard(run_path: str) -> SummaryWriter:
@@ -9,7 +9,7 @@ from .gt_extractor import GTFeaturesExtractor
 from .lane_extractor import LaneFeaturesExtractor
 from .road_extractor import RoadFeaturesExtractor
 from .segment_extractor import SegmentFeaturesExtractor
-from .utils import get_feature_size, normalize_by_feature, normalize_path
+from .utils import get_feature_size, normalize_by_feature, normalize_path, split_features_and_mask
 
 
 __all__ = [
@@ -22,4 +22,5 @@ __all__ = [
     "get_feature_size",
     "normalize_by_feature",
     "normalize_path",
+    "split_features_and_mask",
 ]
@@ -3,12 +3,17 @@
 
 """Base class for feature extractors."""
 
+import functools
+import itertools
+import operator
+
 import jax
 import jax.numpy as jnp
 import matplotlib as mpl
+import numpy as np
 from waymax import datatypes
 
-from vmax.simulator import features, operations, waymax_overrides
+from vmax.simulator import features, waymax_overrides
 from vmax.simulator.features import extractor
 
 
@@ -26,8 +31,20 @@ FEATURE_MAP = {
 }
 
 
+@jax.tree_util.register_pytree_node_class
 class BaseFeaturesExtractor(extractor.AbstractFeaturesExtractor):
-    """Base class for feature extractors."""
+    """Base class for feature extractors.
+
+    Extractors are registered as JAX pytrees without leaves, the extractor itself being the static auxiliary
+    data. Equality and hashing rely on the shape-determining configuration, so structurally identical extractors
+    share the same JIT cache entries.
+
+    """
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        """Register subclasses as JAX pytrees as well."""
+        super().__init_subclass__(**kwargs)
+        jax.tree_util.register_pytree_node_class(cls)
 
     def __init__(
         self,
@@ -98,6 +115,74 @@ class BaseFeaturesExtractor(extractor.AbstractFeaturesExtractor):
         self._path_target_features_key = [
             feature for key in self._path_target_config["features"] for feature in FEATURE_MAP[key]
         ]
+        # The path target is always built from its waypoints
+        if len(self._path_target_features_key) == 0:
+            self._path_target_features_key = ["xy"]
+        assert self._path_target_features_key == ["xy"], "Path target features only support waypoints"
+
+        # Prebuild the (key, getter, normalizer) pipelines used to build each feature
+        self._object_features_ops = [
+            (
+                key,
+                operator.attrgetter(f"metadata.{key}" if key == "object_types" else f"trajectory.{key}"),
+                self._get_normalizer(key),
+            )
+            for key in self._object_features_key
+        ]
+        self._roadgraph_features_ops = [
+            (key, operator.attrgetter(key), self._get_normalizer(key)) for key in self._roadgraph_features_key
+        ]
+        self._traffic_lights_features_ops = [
+            (key, operator.attrgetter(f"traffic_lights.{key}"), self._get_normalizer(key))
+            for key in self._traffic_lights_features_key
+        ]
+
+        self._compute_features_sizes()
+
+    def _static_config(self) -> tuple:
+        """Return the hashable configuration that determines the traced computation.
+
+        Subclasses with additional configuration must extend it.
+
+        """
+        return (
+            type(self),
+            self._obs_past_num_steps,
+            self._num_closest_objects,
+            None if self._meters_box is None else tuple(sorted(self._meters_box.items())),
+            self._roadgraph_top_k,
+            self._roadgraph_interval,
+            self._max_meters,
+            self._roadgraph_top_k_prefilter,
+            self._num_closest_traffic_lights,
+            self._num_target_path_points,
+            self._points_gap,
+            tuple(self._dict_mapping.items()),
+            tuple(self._object_features_key),
+            tuple(self._roadgraph_features_key),
+            tuple(self._traffic_lights_features_key),
+            tuple(self._path_target_features_key),
+        )
+
+    def __eq__(self, other: object) -> bool:
+        """Compare extractors by their static configuration."""
+        if not isinstance(other, BaseFeaturesExtractor):
+            return NotImplemented
+
+        return self._static_config() == other._static_config()
+
+    def __hash__(self) -> int:
+        """Hash the extractor by its static configuration."""
+        return hash(self._static_config())
+
+    def tree_flatten(self) -> tuple[tuple, "BaseFeaturesExtractor"]:
+        """Flatten the extractor into no children and itself as static auxiliary data."""
+        return (), self
+
+    @classmethod
+    def tree_unflatten(cls, aux_data: "BaseFeaturesExtractor", children: tuple) -> "BaseFeaturesExtractor":
+        """Rebuild the extractor from its static auxiliary data."""
+        return aux_data
 
     @property
     def obs_past_num_steps(self) -> int:
@@ -123,6 +208,53 @@ class BaseFeaturesExtractor(extractor.AbstractFeaturesExtractor):
 
         return jax.tree.map(lambda x: x[0], sdc_observation)
 
+    def _get_normalizer(self, feature_key: str) -> functools.partial:
+        """Bind the normalization parameters of a feature key.
+
+        Args:
+            feature_key: The feature key.
+
+        Returns:
+            A function normalizing the data of the given feature.
+
+        """
+        return functools.partial(
+            extractor.normalize_by_feature,
+            feature_key=feature_key,
+            meters=self._max_meters,
+            dict_mapping=self._dict_mapping,
+        )
+
+    def _compute_features_sizes(self) -> None:
+        """Precompute the per-element and flattened sizes of each feature group.
+
+        Must be called again by subclasses that modify the feature keys or the dict mapping after initialization.
+
+        """
+        self._object_features_size = self._get_features_size(self._object_features_key)
+        self._roadgraph_features_size = self._get_features_size(self._roadgraph_features_key)
+        self._traffic_lights_features_size = self._get_features_size(self._traffic_lights_features_key)
+        self._path_target_features_size = self._get_features_size(self._path_target_features_key)
+
+        self._sdc_object_size = 1 * self._obs_past_num_steps * self._object_features_size
+        self._other_objects_size = self._num_closest_objects * self._obs_past_num_steps * self._object_features_size
+        self._roadgraph_size = self._roadgraph_top_k * self._roadgraph_features_size
+        self._traffic_lights_size = (
+            self._num_closest_traffic_lights * self._obs_past_num_steps * self._traffic_lights_features_size
+        )
+        self._path_target_size = self._num_target_path_points * self._path_target_features_size
+
+        self._compute_split_indices()
+
+    def _compute_split_indices(self) -> None:
+        """Precompute the offsets used to split a flattened observation into its feature groups."""
+        self._split_indices = list(
+            itertools.accumulate(
+                (self._sdc_object_size, self._other_objects_size, self._roadgraph_size, self._traffic_lights_size),
+            ),
+        )
+        self._flatten_size = self._split_indices[-1] + self._path_target_size
+
     def _get_features_size(self, feature_keys: str) -> int:
         """Calculate the total feature size for given feature keys.
 
@@ -133,7 +265,32 @@ class BaseFeaturesExtractor(extractor.AbstractFeaturesExtractor):
             The sum of feature sizes.
 
         """
-        return sum([extractor.get_feature_size(key, self._dict_mapping) for key in feature_keys])
+        return _cached_features_size(tuple(feature_keys), tuple(self._dict_mapping.items()))
+
+    def _compute_all_features(
+        self,
+        sdc_obs: datatypes.Observation,
+    ) -> tuple[
+        features.ObjectFeatures,
+        features.RoadgraphFeatures,
+        features.TrafficLightFeatures,
+        features.PathTargetFeatures,
+    ]:
+        """Build all the feature groups from the SDC observation.
+
+        Args:
+            sdc_obs: The SDC observation.
+
+        Returns:
+            A tuple containing the objects, roadgraph, traffic lights and path target features.
+
+        """
+        return (
+            self._build_objects_features(sdc_obs),
+            self._build_roadgraph_features(sdc_obs),
+            self._build_traffic_lights_features(sdc_obs),
+            self._build_target_features(sdc_obs),
+        )
 
     def extract_features(
         self,
@@ -155,10 +312,12 @@ class BaseFeaturesExtractor(extractor.AbstractFeaturesExtractor):
         """
         sdc_observation = self._get_sdc_observation(state)
 
-        objects_features = self._build_objects_features(sdc_observation)
-        roadgraphs_features = self._build_roadgraph_features(sdc_observation)
-        traffic_lights_features = self._build_traffic_lights_features(sdc_observation)
-        path_target_features = self._build_target_features(sdc_observation)
+        (
+            objects_features,
+            roadgraphs_features,
+            traffic_lights_features,
+            path_target_features,
+        ) = self._compute_all_features(sdc_observation)
 
         # (num_agents + 1, obs_past_num_steps, num_trajectories_features)
         stack_object_features = objects_features.stack_fields()
@@ -189,75 +348,64 @@ class BaseFeaturesExtractor(extractor.AbstractFeaturesExtractor):
         """
         batch_dims = vectorized_obs.shape[-3:-1]
         flatten_size = vectorized_obs.shape[-1]
-        unflatten_size = 0
+        unflatten_size = self._flatten_size
 
-        object_features_size = self._get_features_size(self._object_features_key)
-        roadgraph_features_size = self._get_features_size(self._roadgraph_features_key)
-        traffic_lights_features_size = self._get_features_size(self._traffic_lights_features_key)
-        path_target_feature_size = self._get_features_size(self._path_target_features_key)
+        assert flatten_size == unflatten_size, f"Unflatten size {unflatten_size} does not match {flatten_size}"
+
+        (
+            sdc_object_features,
+            other_objects_features,
+            roadgraphs_features,
+            traffic_lights_features,
+            path_target_features,
+        ) = jnp.split(vectorized_obs, self._split_indices, axis=-1)
 
-        sdc_object_size = 1 * self._obs_past_num_steps * object_features_size
-        sdc_object_features = vectorized_obs[..., unflatten_size : unflatten_size + sdc_object_size]
         sdc_object_features = sdc_object_features.reshape(
             *batch_dims,
             1,
             self._obs_past_num_steps,
-            object_features_size,
+            self._object_features_size,
         )
-        unflatten_size += sdc_object_size
-
-        other_objects_size = self._num_closest_objects * self._obs_past_num_steps * object_features_size
-        other_objects_features = vectorized_obs[..., unflatten_size : unflatten_size + other_objects_size]
         other_objects_features = other_objects_features.reshape(
             *batch_dims,
             self._num_closest_objects,
             self._obs_past_num_steps,
-            object_features_size,
+            self._object_features_size,
         )
-        unflatten_size += other_objects_size
-
-        roadgraph_size = self._roadgraph_top_k * roadgraph_features_size
-        roadgraphs_features = vectorized_obs[..., unflatten_size : unflatten_size + roadgraph_size]
         roadgraphs_features = roadgraphs_features.reshape(
             *batch_dims,
             self._roadgraph_top_k,
-            roadgraph_features_size,
+            self._roadgraph_features_size,
         )
-        unflatten_size += roadgraph_size
-
-        traffic_lights_size = self._num_closest_traffic_lights * self._obs_past_num_steps * traffic_lights_features_size
-        traffic_lights_features = vectorized_obs[..., unflatten_size : unflatten_size + traffic_lights_size]
         traffic_lights_features = traffic_lights_features.reshape(
             *batch_dims,
             self._num_closest_traffic_lights,
             self._obs_past_num_steps,
-            traffic_lights_features_size,
+            self._traffic_lights_features_size,
         )
-        unflatten_size += traffic_lights_size
-
-        path_target_size = self._num_target_path_points * path_target_feature_size
-        path_target_features = vectorized_obs[..., unflatten_size : unflatten_size + path_target_size]
         path_target_features = path_target_features.reshape(
             *batch_dims,
             self._num_target_path_points,
-            path_target_feature_size,
+            self._path_target_features_size,
         )
-        unflatten_size += path_target_size
 
-        assert flatten_size == unflatten_size, f"Unflatten size {unflatten_size} does not match {flatten_size}"
+        sdc_object_features, sdc_object_mask = extractor.split_features_and_mask(sdc_object_features)
+        other_objects_features, other_objects_mask = extractor.split_features_and_mask(other_objects_features)
+        roadgraphs_features, roadgraphs_mask = extractor.split_features_and_mask(roadgraphs_features)
+        traffic_lights_features, traffic_lights_mask = extractor.split_features_and_mask(traffic_lights_features)
 
         features = (
-            sdc_object_features[..., :-1],
-            other_objects_features[..., :-1],
-            roadgraphs_features[..., :-1],
-            traffic_lights_features[..., :-1],
+            sdc_object_features,
+            other_objects_features,
+            roadgraphs_features,
+            traffic_lights_features,
             path_target_features,
         )
         masks = (
-            sdc_object_features[..., -1].astype(bool),
-            other_objects_features[..., -1].astype(bool),
-            roadgraphs_features[..., -1].astype(bool),
-            traffic_lights_features[..., -1].astype(bool),
+            sdc_object_mask,
+            other_objects_mask,
+            roadgraphs_mask,
+            traffic_lights_mask,
         )
 
         return features, masks
@@ -272,10 +420,12 @@ class BaseFeaturesExtractor(extractor.AbstractFeaturesExtractor):
         """
         sdc_observation = self._get_sdc_observation(state)
 
-        objects_features = self._build_objects_features(sdc_observation)
-        roadgraphs_features = self._build_roadgraph_features(sdc_observation)
-        traffic_lights_features = self._build_traffic_lights_features(sdc_observation)
-        path_target_features = self._build_target_features(sdc_observation)
+        (
+            objects_features,
+            roadgraphs_features,
+            traffic_lights_features,
+            path_target_features,
+        ) = self._compute_all_features(sdc_observation)
 
         # 1. Plot objects trajectories and bbox
         objects_features.plot(ax)
@@ -308,22 +458,19 @@ class BaseFeaturesExtractor(extractor.AbstractFeaturesExtractor):
         if len(self._object_features_key) == 0:
             return object_features
 
-        # (num_agents,)
-        distances_ego_objects = jnp.linalg.norm(sdc_obs.trajectory.xy[:, -1, :], axis=-1)
-        # (num_agents,)
-        distances_ego_valid_objects = jnp.where(sdc_obs.trajectory.valid[:, -1], distances_ego_objects, jnp.inf)
-        # (num_closest_agents + 1,)
-        closest_object_idxs = operations.get_index(
-            -distances_ego_valid_objects,
-            k=self._num_closest_objects + 1,
-            squeeze=False,
+        # (num_agents,), squared distances preserve the top-k ordering
+        neg_distances_ego_valid_objects = jnp.where(
+            sdc_obs.trajectory.valid[:, -1],
+            -jnp.sum(jnp.square(sdc_obs.trajectory.xy[:, -1, :]), axis=-1),
+            -jnp.inf,
         )
+        # (num_closest_agents + 1,)
+        _, closest_object_idxs = jax.lax.top_k(neg_distances_ego_valid_objects, k=self._num_closest_objects + 1)
 
         object_features = features.ObjectFeatures(field_names=self._object_features_key)
-        for key in self._object_features_key:
-            feature = getattr(sdc_obs.metadata, key) if key == "object_types" else getattr(sdc_obs.trajectory, key)
-            feature = feature[closest_object_idxs]
-            feature = extractor.normalize_by_feature(feature, key, self._max_meters, self._dict_mapping)
+        for key, get_feature, normalize in self._object_features_ops:
+            feature = get_feature(sdc_obs)[closest_object_idxs]
+            feature = normalize(feature)
 
             if feature.ndim == 2:
                 feature = jnp.expand_dims(feature, axis=-1)
@@ -349,9 +496,8 @@ class BaseFeaturesExtractor(extractor.AbstractFeaturesExtractor):
 
         roadgraph_points = self._reduce_and_filter_roadgraph_points(sdc_obs.roadgraph_static_points)
 
-        for key in self._roadgraph_features_key:
-            feature = getattr(roadgraph_points, key)
-            feature = extractor.normalize_by_feature(feature, key, self._max_meters, self._dict_mapping)
+        for key, get_feature, normalize in self._roadgraph_features_ops:
+            feature = normalize(get_feature(roadgraph_points))
 
             if feature.ndim == 1:
                 feature = jnp.expand_dims(feature, axis=-1)
@@ -375,24 +521,18 @@ class BaseFeaturesExtractor(extractor.AbstractFeaturesExtractor):
         if len(self._traffic_lights_features_key) == 0:
             return traffic_light_features
 
-        # (num_agents,)
-        distances_traffic_lights = jnp.linalg.norm(sdc_obs.traffic_lights.xy[:, -1], axis=-1)
-        # (num_agents,)
-        distances_traffic_lights_valid = jnp.where(
+        # (num_traffic_lights,), squared distances preserve the top-k ordering
+        neg_distances_traffic_lights_valid = jnp.where(
             sdc_obs.traffic_lights.valid[:, -1],
-            distances_traffic_lights,
-            jnp.inf,
-        )
-        # (num_closest_agents + 1,)
-        closest_tl_idxs = operations.get_index(
-            -distances_traffic_lights_valid,
-            k=self._num_closest_traffic_lights,
-            squeeze=False,
+            -jnp.sum(jnp.square(sdc_obs.traffic_lights.xy[:, -1]), axis=-1),
+            -jnp.inf,
         )
+        # (num_closest_traffic_lights,)
+        _, closest_tl_idxs = jax.lax.top_k(neg_distances_traffic_lights_valid, k=self._num_closest_traffic_lights)
 
-        for key in self._traffic_lights_features_key:
-            feature = getattr(sdc_obs.traffic_lights, key)[closest_tl_idxs]
-            feature = extractor.normalize_by_feature(feature, key, self._max_meters, self._dict_mapping)
+        for key, get_feature, normalize in self._traffic_lights_features_ops:
+            feature = get_feature(sdc_obs)[closest_tl_idxs]
+            feature = normalize(feature)
 
             if feature.ndim == 2:
                 feature = jnp.expand_dims(feature, axis=-1)
@@ -411,10 +551,6 @@ class BaseFeaturesExtractor(extractor.AbstractFeaturesExtractor):
             An instance of PathTargetFeatures.
 
         """
-        self._path_target_features_key = ["xy"]
-        if len(self._path_target_features_key) == 0:
-            return jnp.array(())
-
         # (1, num_paths, num_points_per_path)
         sdc_paths = sdc_obs.sdc_paths
         # (1, num_paths, 1)
@@ -427,15 +563,16 @@ class BaseFeaturesExtractor(extractor.AbstractFeaturesExtractor):
 
         sdc_paths_xy = datatypes.MaskedArray.create_and_validate(
             value=sdc_paths.xy,
-            valid=jnp.stack([mask, mask], axis=-1),
+            valid=jnp.broadcast_to(mask[..., None], sdc_paths.xy.shape),
         )
         sdc_paths_xy = sdc_paths_xy.masked_value()
 
         sdc_path = sdc_paths_xy[longest_path_idx]
 
-        indices = jnp.arange(self._points_gap, sdc_path.shape[0], self._points_gap)
+        # The path length is static, so the sampled indices are built on host
+        indices = np.arange(self._points_gap, sdc_path.shape[0], self._points_gap)
         indices = indices[: self._num_target_path_points]
-        path_target = jnp.take(sdc_path, indices, axis=0)
+        path_target = sdc_path[indices]
 
         path_target = extractor.normalize_path(path_target, self._max_meters)
 
@@ -451,19 +588,28 @@ class BaseFeaturesExtractor(extractor.AbstractFeaturesExtractor):
             A reduced and filtered roadgraph points.
 
         """
-        roadgraph.valid = roadgraph.valid & self._filter(roadgraph)
+        # Single fused pass: filtered validity, squared distance and +inf sentinel for masked points
+        dist = jnp.where(
+            roadgraph.valid & self._filter(roadgraph),
+            jnp.sum(jnp.square(roadgraph.xy), axis=-1),
+            jnp.inf,
+        )
 
-        xy = roadgraph.xy
-        dist = jnp.linalg.norm(xy, axis=-1)
-        dist = jnp.where(roadgraph.valid, dist, jnp.inf)
+        # Down-sample with a static stride and map the top-k indices back to the full roadgraph
+        num_points = dist.shape[0]
+        dist = dist[:: self._roadgraph_interval]
+        num_sampled_points = dist.shape[0]
 
-        idx_to_keep = jnp.arange(0, len(dist), self._roadgraph_interval)
-        mask = jnp.zeros_like(dist, dtype=bool)
-        mask = mask.at[idx_to_keep].set(True)
-        dist = jnp.where(mask, dist, jnp.inf)
+        num_missing_points = self._roadgraph_top_k - num_sampled_points
+        if num_missing_points > 0:
+            dist = jnp.pad(dist, (0, num_missing_points), constant_values=jnp.inf)
 
-        _, idx = jax.lax.top_k(-dist, self._roadgraph_top_k)
+        _, idx_sub = jax.lax.top_k(-dist, self._roadgraph_top_k)
+        idx = jnp.minimum(idx_sub * self._roadgraph_interval, num_points - 1)
         roadgraph = jax.tree.map(lambda x: x[idx], roadgraph)
+        # The filter is point-wise, so applying it to the kept points only is equivalent.
+        # Padded slots are gathered from a clamped index and must always be invalid.
+        roadgraph.valid = roadgraph.valid & self._filter(roadgraph) & (idx_sub < num_sampled_points)
 
         return roadgraph
 
@@ -480,3 +626,24 @@ class BaseFeaturesExtractor(extractor.AbstractFeaturesExtractor):
 
         """
         return jnp.ones_like(roadgraph.valid, dtype=bool)
+
+
+@functools.cache
+def _cached_features_size(feature_keys: tuple[str, ...], dict_mapping_items: tuple[tuple[str, tuple], ...]) -> int:
+    """Calculate the total feature size, memoized across extractor instances.
+
+    Feature sizes are only computed at construction time, so the memo only deduplicates work between
+    extractors built with the same configuration. The mapping is keyed by content rather than identity
+    since subclasses may update it in place.
+
+    Args:
+        feature_keys: The feature keys.
+        dict_mapping_items: The items of the dictionary mapping.
+
+    Returns:
+        The sum of feature sizes.
+
+    """
+    dict_mapping = dict(dict_mapping_items)
+
+    return sum(extractor.get_feature_size(key, dict_mapping) for key in feature_keys)
@@ -55,16 +55,13 @@ class GTFeaturesExtractor(extractor.BaseFeaturesExtractor):
         flatten_size = vectorized_obs.shape[-1]
         unflatten_size = 0
 
-        path_target_feature_size = self._get_features_size(self._path_target_features_key)
-
-        path_target_size = self._num_target_path_points * path_target_feature_size
-        path_target_features = vectorized_obs[..., unflatten_size : unflatten_size + path_target_size]
+        path_target_features = vectorized_obs[..., unflatten_size : unflatten_size + self._path_target_size]
         path_target_features = path_target_features.reshape(
             *batch_dims,
             self._num_target_path_points,
-            path_target_feature_size,
+            self._path_target_features_size,
         )
-        unflatten_size += path_target_size
+        unflatten_size += self._path_target_size
 
         assert flatten_size == unflatten_size, f"Unflatten size {unflatten_size} does not match {flatten_size}"
 
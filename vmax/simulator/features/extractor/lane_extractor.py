@@ -38,6 +38,7 @@ class LaneFeaturesExtractor(extractor.BaseFeaturesExtractor):
             path_target_config,
         )
         self._dict_mapping["types"] = (0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0)
+        self._compute_features_sizes()
 
     def _filter(self, roadgraph: datatypes.RoadgraphPoints) -> jax.Array:
         """Filter to retain only lane surface street points.
@@ -42,6 +42,22 @@ class SegmentFeaturesExtractor(extractor.BaseFeaturesExtractor):
         self._max_num_lanes = roadgraphs_config["max_num_lanes"]
         self._max_num_points_per_lane = roadgraphs_config["max_num_points_per_lane"]
 
+        num_points = self._max_num_lanes * self._max_num_points_per_lane
+        self._roadgraph_size = (
+            self._max_num_lanes * extractor.get_feature_size("types", self._dict_mapping)
+            if "types" in self._roadgraph_features_key
+            else 0
+        )
+        self._roadgraph_size += num_points * 2 if "xy" in self._roadgraph_features_key else 0
+        self._roadgraph_size += num_points * 2 if "dir_xy" in self._roadgraph_features_key else 0
+        self._roadgraph_size += self._max_num_lanes if "valid" in self._roadgraph_features_key else 0
+        self._traffic_lights_size = self._traffic_lights_features_size
+        self._compute_split_indices()
+
+    def _static_config(self) -> tuple:
+        """Return the hashable configuration that determines the traced computation."""
+        return (*super()._static_config(), self._max_num_lanes, self._max_num_points_per_lane)
+
     def unflatten_features(self, vectorized_obs: jax.Array) -> tuple[tuple[jax.Array, ...], tuple[jax.Array, ...]]:
         """Unflatten a vectorized observation into features and masks.
 
@@ -54,82 +70,64 @@ class SegmentFeaturesExtractor(extractor.BaseFeaturesExtractor):
         """
         batch_dims = vectorized_obs.shape[-3:-1]
         flatten_size = vectorized_obs.shape[-1]
-        unflatten_size = 0
+        unflatten_size = self._flatten_size
 
-        object_features_size = self._get_features_size(self._object_features_key)
-        traffic_lights_features_size = self._get_features_size(self._traffic_lights_features_key)
-        path_target_feature_size = self._get_features_size(self._path_target_features_key)
+        assert flatten_size == unflatten_size, f"Unflatten size {unflatten_size} does not match {flatten_size}"
+
+        (
+            sdc_object_features,
+            other_objects_features,
+            roadgraphs_features,
+            traffic_lights_features,
+            path_target_features,
+        ) = jnp.split(vectorized_obs, self._split_indices, axis=-1)
 
-        sdc_object_size = 1 * self._obs_past_num_steps * object_features_size
-        sdc_object_features = vectorized_obs[..., unflatten_size : unflatten_size + sdc_object_size]
         sdc_object_features = sdc_object_features.reshape(
             *batch_dims,
             1,
             self._obs_past_num_steps,
-            object_features_size,
+            self._object_features_size,
         )
-        unflatten_size += sdc_object_size
-
-        other_objects_size = self._num_closest_objects * self._obs_past_num_steps * object_features_size
-        other_objects_features = vectorized_obs[..., unflatten_size : unflatten_size + other_objects_size]
         other_objects_features = other_objects_features.reshape(
             *batch_dims,
             self._num_closest_objects,
             self._obs_past_num_steps,
-            object_features_size,
+            self._object_features_size,
         )
-        unflatten_size += other_objects_size
-
-        num_points = self._max_num_lanes * self._max_num_points_per_lane
-        roadgraph_size = (
-            self._max_num_lanes * extractor.get_feature_size("types", self._dict_mapping)
-            if "types" in self._roadgraph_features_key
-            else 0
-        )
-        roadgraph_size += num_points * 2 if "xy" in self._roadgraph_features_key else 0
-        roadgraph_size += num_points * 2 if "dir_xy" in self._roadgraph_features_key else 0
-        roadgraph_size += self._max_num_lanes if "valid" in self._roadgraph_features_key else 0
-
-        roadgraphs_features = vectorized_obs[..., unflatten_size : unflatten_size + roadgraph_size]
         roadgraphs_features = roadgraphs_features.reshape(
             *batch_dims,
             self._max_num_lanes,
-            roadgraph_size // self._max_num_lanes,
+            self._roadgraph_size // self._max_num_lanes,
         )
-        unflatten_size += roadgraph_size
-
-        traffic_lights_features = vectorized_obs[..., unflatten_size : unflatten_size + traffic_lights_features_size]
         traffic_lights_features = traffic_lights_features.reshape(
             *batch_dims,
             1,
             1,
-            traffic_lights_features_size,
+            self._traffic_lights_features_size,
         )
-        unflatten_size += traffic_lights_features_size
-
-        path_target_size = self._num_target_path_points * path_target_feature_size
-        path_target_features = vectorized_obs[..., unflatten_size : unflatten_size + path_target_size]
         path_target_features = path_target_features.reshape(
             *batch_dims,
             self._num_target_path_points,
-            path_target_feature_size,
+            self._path_target_features_size,
         )
-        unflatten_size += path_target_size
 
-        assert flatten_size == unflatten_size, f"Unflatten size {unflatten_size} does not match {flatten_size}"
+        sdc_object_features, sdc_object_mask = extractor.split_features_and_mask(sdc_object_features)
+        other_objects_features, other_objects_mask = extractor.split_features_and_mask(other_objects_features)
+        roadgraphs_features, roadgraphs_mask = extractor.split_features_and_mask(roadgraphs_features)
+        traffic_lights_features, traffic_lights_mask = extractor.split_features_and_mask(traffic_lights_features)
 
         features = (
-            sdc_object_features[..., :-1],
-            other_objects_features[..., :-1],
-            roadgraphs_features[..., :-1],
-            traffic_lights_features[..., :-1],
+            sdc_object_features,
+            other_objects_features,
+            roadgraphs_features,
+            traffic_lights_features,
             path_target_features,
         )
         masks = (
-            sdc_object_features[..., -1].astype(bool),
-            other_objects_features[..., -1].astype(bool),
-            roadgraphs_features[..., -1].astype(bool),
-            traffic_lights_features[..., -1].astype(bool),
+            sdc_object_mask,
+            other_objects_mask,
+            roadgraphs_mask,
+            traffic_lights_mask,
         )
 
         return features, masks
@@ -219,10 +217,10 @@ class SegmentFeaturesExtractor(extractor.BaseFeaturesExtractor):
         red_light_id = metrics.get_id_red_for_sdc(sdc_obs)
 
         traffic_light_features = features.TrafficLightFeatures(field_names=self._traffic_lights_features_key)
-        for key in self._traffic_lights_features_key:
-            feature = getattr(sdc_obs.traffic_lights, key)[red_light_id]
+        for key, get_feature, normalize in self._traffic_lights_features_ops:
+            feature = get_feature(sdc_obs)[red_light_id]
             feature = jnp.expand_dims(feature, axis=0)
-            feature = extractor.normalize_by_feature(feature, key, self._max_meters, self._dict_mapping)
+            feature = normalize(feature)
 
             if feature.ndim == 2:
                 feature = jnp.expand_dims(feature, axis=-1)
@@ -143,3 +143,17 @@ def onehot_encoder(types: jax.Array, mapping: tuple[int]) -> jax.Array:
     onehot = jax.nn.one_hot(mapped, max(mapping) + 1, axis=-1)
     # Drop the first "unknown" column. The result will have a size of max_val
     return onehot[..., 1:]
+
+
+def split_features_and_mask(x: jax.Array) -> tuple[jax.Array, jax.Array]:
+    """Split a feature tensor into its features and its validity mask (last channel).
+
+    Args:
+        x: the feature tensor, with the validity flag as last channel
+    Returns:
+        the features and the boolean mask
+
+    """
+    features, mask = jnp.split(x, [x.shape[-1] - 1], axis=-1)
+
+    return features, jnp.squeeze(mask, axis=-1).astype(jnp.bool_)